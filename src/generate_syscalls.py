@@ -9,36 +9,57 @@ import syscalls
 
 def write_syscall_enum(f, arch):
     f.write("enum Syscalls {\n")
+    table = syscalls.table_for_arch(arch)
+    # Syscalls missing from |arch| get distinct negative values, so that
+    # every name is still declared.
+    defined = set(entry[0] for entry in table if entry is not None)
     undefined_syscall = -1
-    for name, obj in sorted(syscalls.all(), key=lambda x: getattr(x[1], arch)):
-        syscall_number = getattr(obj, arch)
-        if syscall_number is not None:
-            enum_number = syscall_number
-        else:
-            enum_number = undefined_syscall
+    for name in syscalls.NAMES:
+        if name not in defined:
+            f.write("  %s = %d,\n" % (name, undefined_syscall))
             undefined_syscall -= 1
-        f.write("  %s = %d,\n" % (name, enum_number))
+    for number, entry in enumerate(table):
+        if entry is not None:
+            f.write("  %s = %d,\n" % (entry[0], number))
     f.write("  SYSCALL_COUNT,\n")
     f.write("};\n")
     f.write("\n")
 
 def write_is_always_emulated_syscall(f):
-    semantics_to_retval = { syscalls.ReplaySemantics.EMU: 'true',
-                            syscalls.ReplaySemantics.EXEC: 'false',
-                            syscalls.ReplaySemantics.MAY_EXEC: 'false' }
+    semantics_to_retval = { syscalls.ReplaySemantics.EMU: '1',
+                            syscalls.ReplaySemantics.EXEC: '0',
+                            syscalls.ReplaySemantics.MAY_EXEC: '0' }
 
     f.write("template <typename Arch> static bool is_always_emulated_syscall_arch(int syscall);\n");
     f.write("\n");
     for specializer, arch in [("X86Arch", "x86"), ("X64Arch", "x64")]:
+        # Indexed by syscall number: 1 if always emulated, 0 if not, -1 if
+        # there is no such syscall.
+        table = syscalls.table_for_arch(arch)
+        lines = ["static const signed char always_emulated_%s[] = {\n" % arch]
+        for number, entry in enumerate(table):
+            if entry is None:
+                lines.append("  -1,\n")
+            else:
+                lines.append("  %s, // %d %s\n"
+                             % (semantics_to_retval[entry[1].semantics],
+                                number, entry[0]))
+        lines.append("};\n")
+        lines.append("\n")
+        f.write("".join(lines))
         f.write("template<> bool is_always_emulated_syscall_arch<%s>(int syscallno) {\n" % specializer)
-        f.write("  switch (syscallno) {\n")
-        for name, obj in syscalls.all():
-            f.write("    case %s::%s: return %s;\n"
-                    % (specializer, name, semantics_to_retval[obj.semantics]))
-        f.write("    default:\n")
-        f.write("      FATAL() << \"Unknown syscall \" << syscallno;\n")
-        f.write("      return true;\n")
+        # A negative number is never a syscall on this architecture: it is
+        # -1 when no syscall is in progress, or the placeholder enum value
+        # of a syscall missing here.  Neither can be emulated.
+        f.write("  if (syscallno < 0) {\n")
+        f.write("    return false;\n")
+        f.write("  }\n")
+        f.write("  if (syscallno < %d &&\n" % len(table))
+        f.write("      always_emulated_%s[syscallno] >= 0) {\n" % arch)
+        f.write("    return always_emulated_%s[syscallno];\n" % arch)
         f.write("  }\n")
+        f.write("  FATAL() << \"Unknown syscall \" << syscallno;\n")
+        f.write("  return true;\n")
         f.write("}\n")
         f.write("\n")
 
@@ -46,33 +67,52 @@ def write_syscallname_arch(f):
     f.write("template <typename Arch> static std::string syscallname_arch(int syscall);\n")
     f.write("\n");
     for specializer, arch in [("X86Arch", "x86"), ("X64Arch", "x64")]:
+        # All names are packed into one string; the offset table, indexed by
+        # syscall number, points into it.  Offset 0 is the empty string and
+        # marks numbers with no syscall.
+        table = syscalls.table_for_arch(arch)
+        offsets = []
+        offset = 1
+        lines = ["static const char syscallnames_%s[] =\n" % arch,
+                 "  \"\\0\"\n"]
+        for entry in table:
+            if entry is None:
+                offsets.append(0)
+                continue
+            name = entry[0]
+            offsets.append(offset)
+            offset += len(name) + 1
+            lines.append("  \"%s\\0\"\n" % name)
+        lines.append(";\n")
+        assert offset <= 0xffff
+        lines.append("static const uint16_t syscallname_offsets_%s[] = {\n" % arch)
+        for number, name_offset in enumerate(offsets):
+            lines.append("  %d, // %d\n" % (name_offset, number))
+        lines.append("};\n")
+        lines.append("\n")
+        f.write("".join(lines))
         f.write("template <> std::string syscallname_arch<%s>(int syscall) {\n" % specializer)
-        f.write("  switch (syscall) {\n");
-        def write_case(name):
-            f.write("    case %(specializer)s::%(syscall)s: return \"%(syscall)s\";\n"
-                    % { 'specializer': specializer, 'syscall': name })
-        for name, _ in syscalls.for_arch(arch):
-            write_case(name)
-        f.write("    default: {")
-        f.write("      char buf[100];")
-        f.write("      sprintf(buf, \"<unknown-syscall-%d>\", syscall);")
-        f.write("      return buf;\n")
-        f.write("    }\n")
+        f.write("  if (syscall >= 0 && syscall < %d &&\n" % len(table))
+        f.write("      syscallname_offsets_%s[syscall]) {\n" % arch)
+        f.write("    return syscallnames_%s + syscallname_offsets_%s[syscall];\n"
+                % (arch, arch))
         f.write("  }\n")
+        f.write("  char buf[100];\n")
+        f.write("  sprintf(buf, \"<unknown-syscall-%d>\", syscall);\n")
+        f.write("  return buf;\n")
         f.write("}\n")
         f.write("\n")
 
 def write_syscall_record_cases(f):
     def write_recorder_for_arg(syscall, arg):
-        arg_descriptor = getattr(syscall, 'arg' + str(arg), None)
-        if isinstance(arg_descriptor, str):
+        if syscalls.has_arg(syscall, arg):
             f.write("    syscall_state.reg_parameter<%s>(%d);\n"
-                    % (arg_descriptor, arg))
+                    % (syscall.args[arg - 1], arg))
     for name, obj in syscalls.all():
         # Irregular syscalls will be handled by hand-written code elsewhere.
-        if isinstance(obj, syscalls.RegularSyscall):
+        if obj.kind in syscalls.REGULAR_KINDS:
             f.write("  case Arch::%s:\n" % name)
-            for arg in range(1,6):
+            for arg in range(1,7):
                 write_recorder_for_arg(obj, arg)
             f.write("    return syscall_state.done_preparing(PREVENT_SWITCH);\n")
 
@@ -124,29 +164,44 @@ def write_syscall_helper_functions(f):
         f.write(is_syscall.safe_substitute(subs))
         f.write(syscall_number.safe_substitute(subs))
 
-    for name, obj in syscalls.all():
+    for name in syscalls.NAMES:
         write_helpers(name)
 
+def syscall_def_types():
+    """Return a dict mapping each syscall's name to its replay syscall_def
+    type.
+
+    Unsupported and invalid syscalls have no syscall_def and map to None.
+    """
+    types = {}
+    for idx, kind in enumerate(syscalls.KINDS):
+        if kind in syscalls.REGULAR_KINDS:
+            semantics = syscalls.SEMANTICS[idx]
+            def_type = "rep_" + syscalls.ReplaySemantics.SEMANTICS_NAME[semantics]
+        elif kind in syscalls.IRREGULAR_KINDS or kind == syscalls.KIND_RESTART:
+            def_type = "rep_EMU"
+        else:
+            def_type = None
+        types[syscalls.NAMES[idx]] = def_type
+    return types
+
 def write_syscall_defs_table(f):
+    def_types = syscall_def_types()
     for specializer, arch in [("X86Arch", "x86"), ("X64Arch", "x64")]:
-        f.write("template<> syscall_defs<%s>::Table syscall_defs<%s>::table = {\n"
-                % (specializer, specializer))
-        arch_syscalls = sorted(syscalls.for_arch(arch), key=lambda x: getattr(x[1], arch))
-        for name, obj in arch_syscalls:
-            if isinstance(obj, syscalls.RegularSyscall):
-                f.write("  { %s::%s, { rep_%s } },\n"
-                        % (specializer, name, obj.semantics))
-            elif isinstance(obj, (syscalls.IrregularSyscall, syscalls.RestartSyscall)):
-                f.write("  { %s::%s, { rep_EMU } },\n" % (specializer, name))
-            elif isinstance(obj, syscalls.UnsupportedSyscall):
-                pass
-        f.write("};\n")
-        f.write("\n")
+        lines = ["template<> syscall_defs<%s>::Table syscall_defs<%s>::table = {\n"
+                 % (specializer, specializer)]
+        for entry in syscalls.table_for_arch(arch):
+            if entry is not None and def_types[entry[0]] is not None:
+                lines.append("  { %s::%s, { %s } },\n"
+                             % (specializer, entry[0], def_types[entry[0]]))
+        lines.append("};\n")
+        lines.append("\n")
+        f.write("".join(lines))
 
 def write_check_syscall_numbers(f):
-    for name, obj in syscalls.all():
+    for name, x86 in zip(syscalls.NAMES, syscalls.X86_NUMBERS):
         # XXX hard-coded to x86 currently
-        if not obj.x86:
+        if x86 <= 0:
             continue
         f.write("""static_assert(X86Arch::%s == SYS_%s, "Incorrect syscall number for %s");\n"""
                 % (name, name, name))
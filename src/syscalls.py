@@ -1,35 +1,85 @@
+import array
+import bisect
+import sys
+
+try:
+    _intern = sys.intern
+except AttributeError:
+    _intern = intern            # Python 2
+
+# The kind of each concrete syscall class below, as stored in the KINDS table.
+(KIND_EMULATED, KIND_EXECUTED, KIND_IRREGULAR_EMULATED,
+ KIND_IRREGULAR_MAY_EXEC, KIND_RESTART, KIND_UNSUPPORTED,
+ KIND_INVALID) = range(7)
+
+# Printable names of the above, indexed by kind.
+KIND_NAME = ("EMULATED", "EXECUTED", "IRREGULAR_EMULATED",
+             "IRREGULAR_MAY_EXEC", "RESTART", "UNSUPPORTED", "INVALID")
+
+# Kinds of RegularSyscalls and of IrregularSyscalls, respectively.
+REGULAR_KINDS = frozenset([KIND_EMULATED, KIND_EXECUTED])
+IRREGULAR_KINDS = frozenset([KIND_IRREGULAR_EMULATED, KIND_IRREGULAR_MAY_EXEC])
+
+# Syscalls with identical argument types share a single args tuple; this
+# pool maps each distinct tuple to its shared instance.  The type strings in
+# pooled tuples are interned, so equal types are also the same object.
+_NO_ARGS = (None,) * 6
+_ARGS_POOL = { _NO_ARGS: _NO_ARGS }
+
+# Every syscall, in declaration order.  Constructors append the bare
+# objects; once all syscalls are declared, _name_registry() turns this into
+# a tuple of (name, syscall) pairs.
+_REGISTRY = []
+
 class BaseSyscall(object):
     """A base class for syscalls.
 
     The constructor accepts specifications for the x86 and x86-64 syscall
     numbers; if one of them does not exist, then the associated syscall is
     assumed to not exist on the corresponding architecture.
+
+    Syscall classes declare __slots__ all the way down the hierarchy so that
+    instances carry no per-instance __dict__.
+
+    The args attribute holds the arg1...arg6 types of the syscall, None where
+    no type is given; only RegularSyscalls give any.
     """
+    __slots__ = ('x86', 'x64', '_idx')
+    args = _NO_ARGS
 
-    # Take **kwargs and ignore to make life easier on RegularSyscall.
-    def __init__(self, x86=None, x64=None, **kwargs):
+    def __init__(self, x86=None, x64=None):
         assert x86 or x64       # Must exist on one architecture.
         self.x86 = x86
         self.x64 = x64
+        _REGISTRY.append(self)
+
+    def __repr__(self):
+        return _REPRS[self._idx]
 
 class ReplaySemantics(object):
-    """A class representing how rr replays syscalls."""
+    """A class representing how rr replays syscalls.
+
+    Concrete syscall classes fix their semantics with a class-level
+    `semantics' attribute, so ReplaySemantics needs no __init__ and
+    constructing a syscall does not chain through every base class.
+    """
 
-    EMU = "EMU"                 # Syscall is fully emulated.
-    EXEC = "EXEC"               # Syscall is fully executed.
-    MAY_EXEC = "MAY_EXEC"       # Syscall may be fully executed
+    EMU = 0                     # Syscall is fully emulated.
+    EXEC = 1                    # Syscall is fully executed.
+    MAY_EXEC = 2                # Syscall may be fully executed
 
-    ALL_SEMANTICS = ["EMU", "EXEC", "MAY_EXEC"]
+    ALL_SEMANTICS = frozenset([EMU, EXEC, MAY_EXEC])
 
-    def __init__(self, semantics):
-        assert semantics in self.ALL_SEMANTICS
-        self.semantics = semantics
+    # Printable names of the above, indexed by semantics value.
+    SEMANTICS_NAME = ("EMU", "EXEC", "MAY_EXEC")
+
+    __slots__ = ()
 
 class RestartSyscall(BaseSyscall, ReplaySemantics):
     """A special class for the restart_syscall syscall."""
-    def __init__(self, x86=None, x64=None):
-        BaseSyscall.__init__(self, x86=x86, x64=x64)
-        ReplaySemantics.__init__(self, ReplaySemantics.EXEC)
+    __slots__ = ()
+    kind = KIND_RESTART
+    semantics = ReplaySemantics.EXEC
 
 class UnsupportedSyscall(BaseSyscall, ReplaySemantics):
     """A syscall that is unsupported by rr.
@@ -38,9 +88,9 @@ class UnsupportedSyscall(BaseSyscall, ReplaySemantics):
     can be displayed in error messages, if nothing else.  They also serve as
     useful documentation.
     """
-    def __init__(self, x86=None, x64=None):
-        BaseSyscall.__init__(self, x86=x86, x64=x64)
-        ReplaySemantics.__init__(self, ReplaySemantics.EXEC)
+    __slots__ = ()
+    kind = KIND_UNSUPPORTED
+    semantics = ReplaySemantics.EXEC
 
 class InvalidSyscall(UnsupportedSyscall):
     """A syscall that is unsupported by rr and unimplemented by Linux.
@@ -49,8 +99,8 @@ class InvalidSyscall(UnsupportedSyscall):
     by rr from other UnsupportedSyscalls, to help us track the completeness
     of rr's syscall support.
     """
-    def __init__(self, x86=None, x64=None):
-        UnsupportedSyscall.__init__(self, x86=x86, x64=x64)
+    __slots__ = ()
+    kind = KIND_INVALID
 
 class RegularSyscall(BaseSyscall, ReplaySemantics):
     """A syscall for which replay information may be recorded automatically.
@@ -64,64 +114,48 @@ class RegularSyscall(BaseSyscall, ReplaySemantics):
     To ensure correct handling for mixed-arch process groups (e.g. a mix of 32
     and 64-bit processes), types should be specified using Arch instead of
     referring directly to the host system types.
+
+    Not to be manually instantiated; use EmulatedSyscall or ExecutedSyscall.
     """
-    def __init__(self, semantics=None, **kwargs):
-        assert semantics in [ReplaySemantics.EMU,
-                             ReplaySemantics.EXEC]
-        ReplaySemantics.__init__(self, semantics)
-        BaseSyscall.__init__(self, **kwargs)
-        for a in range(1,6):
-            arg = 'arg' + str(a)
-            if arg in kwargs:
-                self.__setattr__(arg, kwargs[arg])
+    __slots__ = ('args',)
+
+    def __init__(self, x86=None, x64=None, arg1=None, arg2=None, arg3=None,
+                 arg4=None, arg5=None, arg6=None):
+        args = (arg1, arg2, arg3, arg4, arg5, arg6)
+        pooled = _ARGS_POOL.get(args)
+        if pooled is None:
+            pooled = _ARGS_POOL[args] = tuple(_intern(arg) if arg else arg
+                                              for arg in args)
+        self.args = pooled
+        BaseSyscall.__init__(self, x86, x64)
 
 class EmulatedSyscall(RegularSyscall):
-    """A wrapper for regular syscalls.
-
-    This class should be used in preference to manually passing the semantics
-    keyword argument.  Its constructor ensures the correct value is passed for
-    the semantics argument.
-    """
-    def __init__(self, **kwargs):
-        RegularSyscall.__init__(self, semantics=ReplaySemantics.EMU, **kwargs)
+    """A regular syscall having EMU semantics."""
+    __slots__ = ()
+    kind = KIND_EMULATED
+    semantics = ReplaySemantics.EMU
 
 class ExecutedSyscall(RegularSyscall):
-    """A wrapper for regular syscalls.
-
-    This class should be used in preference to manually passing the semantics
-    keyword argument.  Its constructor ensures the correct value is passed for
-    the semantics argument.
-    """
-    def __init__(self, **kwargs):
-        RegularSyscall.__init__(self, semantics=ReplaySemantics.EXEC, **kwargs)
+    """A regular syscall having EXEC semantics."""
+    __slots__ = ()
+    kind = KIND_EXECUTED
+    semantics = ReplaySemantics.EXEC
 
 class IrregularSyscall(BaseSyscall, ReplaySemantics):
     """A base class for irregular syscalls.  Not to be manually instantiated."""
-    def __init__(self, semantics=None, **kwargs):
-        assert semantics in [ReplaySemantics.MAY_EXEC,
-                             ReplaySemantics.EMU]
-        ReplaySemantics.__init__(self, semantics)
-        BaseSyscall.__init__(self, **kwargs)
+    __slots__ = ()
 
 class IrregularEmulatedSyscall(IrregularSyscall):
-    """A wrapper for irregular syscalls having EMU semantics.
-
-    This class should be used in preference to manually passing the semantics
-    keyword argument.  Its constructor ensures the correct value is passed for
-    the semantics argument.
-    """
-    def __init__(self, **kwargs):
-        IrregularSyscall.__init__(self, semantics=ReplaySemantics.EMU, **kwargs)
+    """An irregular syscall having EMU semantics."""
+    __slots__ = ()
+    kind = KIND_IRREGULAR_EMULATED
+    semantics = ReplaySemantics.EMU
 
 class IrregularMayExecSyscall(IrregularSyscall):
-    """A wrapper for irregular syscalls having MAY_EXEC semantics.
-
-    This class should be used in preference to manually passing the semantics
-    keyword argument.  Its constructor ensures the correct value is passed for
-    the semantics argument.
-    """
-    def __init__(self, **kwargs):
-        IrregularSyscall.__init__(self, semantics=ReplaySemantics.MAY_EXEC, **kwargs)
+    """An irregular syscall having MAY_EXEC semantics."""
+    __slots__ = ()
+    kind = KIND_IRREGULAR_MAY_EXEC
+    semantics = ReplaySemantics.MAY_EXEC
 
 #  void exit(int status)
 #
@@ -1717,15 +1751,239 @@ security = InvalidSyscall(x64=185)
 epoll_ctl_old = UnsupportedSyscall(x64=214)
 epoll_wait_old = UnsupportedSyscall(x64=215)
 
+def _name_registry():
+    names = dict((id(obj), name) for name, obj in globals().items()
+                 if isinstance(obj, BaseSyscall))
+    return tuple((_intern(names[id(obj)]), obj) for obj in _REGISTRY)
+
+_REGISTRY = _name_registry()
+
 def _syscalls():
-    for name, obj in globals().iteritems():
-        if isinstance(obj, BaseSyscall):
-            yield name, obj
+    return iter(_REGISTRY)
 
 def all():
-    return list(_syscalls())
+    """Return a tuple of (name, syscall) pairs, in declaration order.
+
+    The tuple is shared between callers; it is never rebuilt.
+    """
+    return _REGISTRY
+
+# Per-architecture results of for_arch(), filled in on first use.
+_BY_ARCH = {}
 
 def for_arch(arch):
-    for name, obj in all():
-        if getattr(obj, arch) is not None:
-            yield name, obj
+    """Return a tuple of (name, syscall) for each syscall on |arch|, in
+    number order."""
+    syscalls = _BY_ARCH.get(arch)
+    if syscalls is None:
+        syscalls = _BY_ARCH[arch] = tuple((NAMES[idx], SYSCALLS[idx])
+                                          for idx in
+                                          _TO_INDEX[_ARCH_IDX[arch]]
+                                          if idx >= 0)
+    return syscalls
+
+# The largest syscall number (exclusive) that the flat tables below can map.
+MAX_SYSCALL_NUMBER = 512
+
+def _build_tables():
+    """Compact the syscall objects into flat, structure-of-arrays tables.
+
+    Row i of NAMES, SYSCALLS, KINDS, SEMANTICS, X86_NUMBERS and X64_NUMBERS
+    describes a single syscall, and each syscall object records its row as
+    _idx.  Rows are sorted by name.  The *_NUMBERS tables hold -1 where a
+    syscall does not exist on an architecture.  X86_TO_INDEX and
+    X64_TO_INDEX map a syscall number to its row, or to -1 if no syscall has
+    that number on the corresponding architecture.
+
+    Argument types are pooled: ARG_TYPES holds each distinct type string
+    once, after None at index 0, and ARG_TYPE_IDS[6*i + n-1] is the
+    ARG_TYPES index of argument n of row i.
+    """
+    names = []
+    objs = []
+    kinds = array.array('b')
+    semantics = array.array('b')
+    arg_types = [None]
+    arg_type_ids = array.array('B')
+    type_ids = { None: 0 }
+    x86_numbers = array.array('h')
+    x64_numbers = array.array('h')
+    x86_to_index = array.array('h', [-1] * MAX_SYSCALL_NUMBER)
+    x64_to_index = array.array('h', [-1] * MAX_SYSCALL_NUMBER)
+    for idx, (name, obj) in enumerate(sorted(_syscalls(), key=lambda x: x[0])):
+        obj._idx = idx
+        names.append(name)
+        objs.append(obj)
+        kinds.append(obj.kind)
+        semantics.append(obj.semantics)
+        for arg in obj.args:
+            type_id = type_ids.get(arg)
+            if type_id is None:
+                type_id = type_ids[arg] = len(arg_types)
+                arg_types.append(arg)
+            arg_type_ids.append(type_id)
+        x86_numbers.append(-1 if obj.x86 is None else obj.x86)
+        x64_numbers.append(-1 if obj.x64 is None else obj.x64)
+        if obj.x86 is not None:
+            x86_to_index[obj.x86] = idx
+        if obj.x64 is not None:
+            x64_to_index[obj.x64] = idx
+    return (tuple(names), tuple(objs), kinds, semantics, tuple(arg_types),
+            arg_type_ids, x86_numbers, x64_numbers, x86_to_index, x64_to_index)
+
+(NAMES, SYSCALLS, KINDS, SEMANTICS, ARG_TYPES, ARG_TYPE_IDS,
+ X86_NUMBERS, X64_NUMBERS, X86_TO_INDEX, X64_TO_INDEX) = _build_tables()
+
+# Architectures are numbered once here; the per-architecture tables below
+# are tuples indexed by that number, so _NUMBERS[_ARCH_IDX[arch]][i] is the
+# number of row i's syscall on |arch|.
+_ARCH_IDX = { 'x86': 0, 'x64': 1 }
+_NUMBERS = (X86_NUMBERS, X64_NUMBERS)
+_TO_INDEX = (X86_TO_INDEX, X64_TO_INDEX)
+
+def arg_types(idx):
+    """Return the arg1...arg6 types of row |idx|, None where not given."""
+    return tuple(ARG_TYPES[type_id]
+                 for type_id in ARG_TYPE_IDS[6 * idx:6 * idx + 6])
+
+def _arg_mask(idx):
+    mask = 0
+    for n in range(6):
+        if ARG_TYPE_IDS[6 * idx + n]:
+            mask |= 1 << n
+    return mask
+
+# Bit n-1 of row i is set if syscall i describes its argument n.
+ARG_MASKS = array.array('B', [_arg_mask(idx) for idx in range(len(NAMES))])
+
+def has_arg(syscall, n):
+    """Return True if |syscall| describes the size of its argument |n|."""
+    return bool(ARG_MASKS[syscall._idx] & (1 << (n - 1)))
+
+# Bit _ARCH_IDX[arch] of row i is set if syscall i exists on |arch|.
+_ARCH_BIT = dict((arch, 1 << idx) for arch, idx in _ARCH_IDX.items())
+ARCH_MASKS = array.array('B', [sum(1 << arch_idx
+                                   for arch_idx, numbers in enumerate(_NUMBERS)
+                                   if numbers[idx] >= 0)
+                               for idx in range(len(NAMES))])
+
+def arch_mask(arches):
+    """Return the ARCH_MASKS bits of the architectures in |arches|."""
+    mask = 0
+    for arch in arches:
+        mask |= _ARCH_BIT[arch]
+    return mask
+
+def for_any_arch(arches):
+    """Yield (name, syscall) for each syscall that exists on at least one of
+    |arches|, in name order."""
+    wanted = arch_mask(arches)
+    for idx, mask in enumerate(ARCH_MASKS):
+        if mask & wanted:
+            yield NAMES[idx], SYSCALLS[idx]
+
+def iter_syscalls():
+    """Yield (name, kind, x86, x64, arg_types) for each row of the tables.
+
+    This reads only the flat tables; x86 and x64 are -1 where the syscall
+    does not exist.
+    """
+    for idx, name in enumerate(NAMES):
+        yield (name, KINDS[idx], X86_NUMBERS[idx], X64_NUMBERS[idx],
+               arg_types(idx))
+
+# Preformatted repr() of each row's syscall.
+_REPRS = tuple('<%s %s x86=%s x64=%s>' % (type(obj).__name__, name,
+                                          obj.x86, obj.x64)
+               for name, obj in zip(NAMES, SYSCALLS))
+
+# "from syscalls import *" exports the syscalls themselves.
+__all__ = NAMES
+
+# Per-architecture results of table_for_arch(), filled in on first use.
+_TABLE_BY_ARCH = {}
+
+def table_for_arch(arch):
+    """Return a tuple, indexed by syscall number, of the (name, syscall)
+    pairs on |arch|.  Numbers with no syscall hold None.  The tuple ends at
+    the highest syscall number |arch| uses."""
+    table = _TABLE_BY_ARCH.get(arch)
+    if table is None:
+        arch_idx = _ARCH_IDX[arch]
+        to_index = _TO_INDEX[arch_idx]
+        entries = [None] * (max(_NUMBERS[arch_idx]) + 1)
+        for nr in range(len(entries)):
+            idx = to_index[nr]
+            if idx >= 0:
+                entries[nr] = (NAMES[idx], SYSCALLS[idx])
+        table = _TABLE_BY_ARCH[arch] = tuple(entries)
+    return table
+
+def _lookup(table, nr):
+    if 0 <= nr < MAX_SYSCALL_NUMBER:
+        return table[nr]
+    return -1
+
+def lookup_x86(nr):
+    """Return the table row of x86 syscall |nr|, or -1 if there is none."""
+    return _lookup(X86_TO_INDEX, nr)
+
+def lookup_x64(nr):
+    """Return the table row of x86-64 syscall |nr|, or -1 if there is none."""
+    return _lookup(X64_TO_INDEX, nr)
+
+def lookup_name(name):
+    """Return the table row of the syscall called |name|, or -1 if none is.
+
+    NAMES is sorted, so this is a binary search rather than a dict lookup.
+    """
+    idx = bisect.bisect_left(NAMES, name)
+    if idx < len(NAMES) and NAMES[idx] == name:
+        return idx
+    return -1
+
+def by_x86(nr):
+    """Return the x86 syscall numbered |nr|, or None if there is none."""
+    idx = _lookup(X86_TO_INDEX, nr)
+    return SYSCALLS[idx] if idx >= 0 else None
+
+def by_x64(nr):
+    """Return the x86-64 syscall numbered |nr|, or None if there is none."""
+    idx = _lookup(X64_TO_INDEX, nr)
+    return SYSCALLS[idx] if idx >= 0 else None
+
+def _kind_bitmap(numbers, kinds):
+    bitmap = bytearray(MAX_SYSCALL_NUMBER // 8)
+    for idx, nr in enumerate(numbers):
+        if nr >= 0 and KINDS[idx] in kinds:
+            bitmap[nr >> 3] |= 1 << (nr & 7)
+    return bitmap
+
+# Bitmaps, indexed by syscall number, of the syscalls rr does not support.
+# Invalid syscalls are also unsupported.
+_UNSUPPORTED_KINDS = (KIND_UNSUPPORTED, KIND_INVALID)
+_unsupported_x86 = _kind_bitmap(X86_NUMBERS, _UNSUPPORTED_KINDS)
+_unsupported_x64 = _kind_bitmap(X64_NUMBERS, _UNSUPPORTED_KINDS)
+_invalid_x86 = _kind_bitmap(X86_NUMBERS, (KIND_INVALID,))
+_invalid_x64 = _kind_bitmap(X64_NUMBERS, (KIND_INVALID,))
+
+def _bit_set(bitmap, nr):
+    if 0 <= nr < MAX_SYSCALL_NUMBER:
+        return bool(bitmap[nr >> 3] & (1 << (nr & 7)))
+    return False
+
+def is_unsupported_x86(nr):
+    """Return True if x86 syscall |nr| is an UnsupportedSyscall."""
+    return _bit_set(_unsupported_x86, nr)
+
+def is_unsupported_x64(nr):
+    """Return True if x86-64 syscall |nr| is an UnsupportedSyscall."""
+    return _bit_set(_unsupported_x64, nr)
+
+def is_invalid_x86(nr):
+    """Return True if x86 syscall |nr| is an InvalidSyscall."""
+    return _bit_set(_invalid_x86, nr)
+
+def is_invalid_x64(nr):
+    """Return True if x86-64 syscall |nr| is an InvalidSyscall."""
+    return _bit_set(_invalid_x64, nr)